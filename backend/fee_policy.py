@@ -0,0 +1,129 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+# Fee policies
+#
+# Every policy is evaluated with numpy so the same code prices a single live
+# order in create_order and millions of historical orders in fee_simulator.py.
+
+
+class FeePolicy:
+    """Order fee rules: tiered service fee, flat delivery fee with an optional
+    free-delivery threshold, and an optional small-order surcharge."""
+
+    def __init__(
+        self,
+        name: str,
+        service_tiers: List[Tuple[float, float]] = ((0.0, 0.05),),
+        transportation_fee: float = 2.99,
+        free_delivery_threshold: Optional[float] = None,
+        min_order_amount: Optional[float] = None,
+        small_order_fee: float = 0.0,
+    ):
+        # service_tiers: (subtotal lower bound, rate) pairs; the rate of the
+        # highest bound not above the subtotal applies to the whole subtotal.
+        tiers = sorted(service_tiers)
+        if not tiers or tiers[0][0] > 0:
+            raise ValueError("service_tiers must start at a subtotal of 0")
+        self.name = name
+        self.service_tiers = tiers
+        self.transportation_fee = transportation_fee
+        self.free_delivery_threshold = free_delivery_threshold
+        self.min_order_amount = min_order_amount
+        self.small_order_fee = small_order_fee
+        self._tier_bounds = np.array([bound for bound, _ in tiers], dtype=np.float64)
+        self._tier_rates = np.array([rate for _, rate in tiers], dtype=np.float64)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "FeePolicy":
+        data = dict(data)
+        if "service_tiers" in data:
+            data["service_tiers"] = [tuple(tier) for tier in data["service_tiers"]]
+        return cls(**data)
+
+    def _unrounded_fees(self, subtotals: np.ndarray) -> Dict[str, np.ndarray]:
+        subtotals = np.asarray(subtotals, dtype=np.float64)
+
+        tier_index = np.searchsorted(self._tier_bounds, subtotals, side="right") - 1
+        service_fee = subtotals * self._tier_rates[np.clip(tier_index, 0, None)]
+
+        transportation_fee = np.full_like(subtotals, self.transportation_fee)
+        if self.free_delivery_threshold is not None:
+            transportation_fee[subtotals >= self.free_delivery_threshold] = 0.0
+
+        small_order_fee = np.zeros_like(subtotals)
+        if self.min_order_amount is not None:
+            small_order_fee[subtotals < self.min_order_amount] = self.small_order_fee
+
+        return {
+            "service_fee": service_fee,
+            "transportation_fee": transportation_fee,
+            "small_order_fee": small_order_fee,
+        }
+
+    def compute_fees(self, subtotals: np.ndarray) -> Dict[str, np.ndarray]:
+        """Vectorized fees for an array of order subtotals, rounded to cents
+        exactly as order_fees rounds them."""
+        return {key: round_cents(value) for key, value in self._unrounded_fees(subtotals).items()}
+
+    def order_fees(self, subtotal: float) -> Dict[str, float]:
+        """Fees and total for a single order, as stored by create_order."""
+        unrounded = {key: float(value[0]) for key, value in self._unrounded_fees([subtotal]).items()}
+        fees = {key: round(value, 2) for key, value in unrounded.items()}
+        # Total from the unrounded fees, as create_order has always stored it
+        fees["total"] = round(
+            subtotal + unrounded["service_fee"] + unrounded["transportation_fee"] + unrounded["small_order_fee"], 2
+        )
+        return fees
+
+
+def round_cents(values: np.ndarray) -> np.ndarray:
+    """Vectorized equivalent of Python's round(value, 2).
+
+    np.round(values, 2) rounds the already-rounded product values * 100, so
+    e.g. 12.90 * 0.05 (0.645 in decimal, slightly above it in binary) comes out
+    as 0.64 where round() gives 0.65. Here the rounding error of the scaling is
+    recovered exactly (Dekker's two-product) and used to break near-ties.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scaled = values * 100.0
+    split = values * 134217729.0  # 2**27 + 1
+    high = split - (split - values)
+    low = values - high
+    error = (high * 100.0 - scaled) + low * 100.0  # values * 100 == scaled + error exactly
+
+    cents = np.floor(scaled)
+    # Distance of the exact product from the half-way point, with the right sign
+    above_half = (scaled - cents - 0.5) + error
+    tie = above_half == 0
+    cents = np.where(above_half > 0, cents + 1, cents)
+    cents = np.where(tie & (np.fmod(cents, 2) != 0), cents + 1, cents)
+    return cents / 100.0
+
+
+# Policy charged on new orders
+CURRENT_FEE_POLICY = FeePolicy("current")
+
+# Candidates evaluated by fee_simulator.py when no policy file is given
+CANDIDATE_FEE_POLICIES = [
+    FeePolicy(
+        "tiered_service",
+        service_tiers=[(0.0, 0.06), (25.0, 0.05), (50.0, 0.04)],
+    ),
+    FeePolicy(
+        "free_delivery_over_35",
+        free_delivery_threshold=35.0,
+    ),
+    FeePolicy(
+        "small_order_surcharge",
+        min_order_amount=10.0,
+        small_order_fee=1.50,
+    ),
+    FeePolicy(
+        "tiered_free_delivery_surcharge",
+        service_tiers=[(0.0, 0.06), (25.0, 0.05), (50.0, 0.04)],
+        free_delivery_threshold=35.0,
+        min_order_amount=10.0,
+        small_order_fee=1.50,
+    ),
+]
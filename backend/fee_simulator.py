@@ -0,0 +1,162 @@
+"""Offline fee-policy simulator.
+
+Streams historical orders out of ``db.orders`` in fixed-size chunks of
+columnar numpy arrays and re-prices every chunk under each candidate policy,
+keeping only running totals so memory stays bounded by the chunk size.
+Orders store their subtotal rounded to cents while create_order priced the
+unrounded sum, so the "current" policy can still differ from the recorded
+fees by a cent on the rare order whose subtotal carried float noise.
+
+    python fee_simulator.py --policies policies.json --status paid
+
+``policies.json`` is a list of ``FeePolicy`` keyword arguments, e.g.
+``[{"name": "free_over_40", "free_delivery_threshold": 40.0}]``.
+"""
+import json
+import os
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import typer
+from pymongo import MongoClient
+
+from fee_policy import CANDIDATE_FEE_POLICIES, CURRENT_FEE_POLICY, FeePolicy
+
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+DEFAULT_CHUNK_SIZE = 100_000
+
+FEE_COLUMNS = ["service_fee", "transportation_fee", "small_order_fee"]
+
+# Report row for the fees actually stored on the orders
+RECORDED = "recorded"
+
+
+def load_order_chunks(
+    collection,
+    query: Optional[Dict] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[Dict[str, np.ndarray]]:
+    """Yield orders as dicts of float64 column arrays, ``chunk_size`` rows at a time."""
+    projection = {"_id": 0, "subtotal": 1, **{column: 1 for column in FEE_COLUMNS}}
+    cursor = collection.find(query or {}, projection).batch_size(chunk_size)
+    try:
+        while True:
+            docs = list(islice(cursor, chunk_size))
+            if not docs:
+                break
+            chunk = {
+                column: np.fromiter((doc.get(column, 0.0) for doc in docs), dtype=np.float64, count=len(docs))
+                for column in ["subtotal", *FEE_COLUMNS]
+            }
+            yield chunk
+    finally:
+        cursor.close()
+
+
+def simulate(chunks: Iterable[Dict[str, np.ndarray]], policies: List[FeePolicy]) -> pd.DataFrame:
+    """Re-price every chunk under each policy and compare against recorded fees."""
+    check_policy_names(policies)
+    totals = {
+        name: {"orders": 0, **{column: 0.0 for column in FEE_COLUMNS}, "free_delivery_orders": 0, "surcharged_orders": 0}
+        for name in [RECORDED, *(policy.name for policy in policies)]
+    }
+
+    for chunk in chunks:
+        orders = len(chunk["subtotal"])
+        recorded = totals[RECORDED]
+        recorded["orders"] += orders
+        for column in FEE_COLUMNS:
+            recorded[column] += float(chunk[column].sum())
+        recorded["free_delivery_orders"] += int(np.count_nonzero(chunk["transportation_fee"] == 0))
+        recorded["surcharged_orders"] += int(np.count_nonzero(chunk["small_order_fee"] > 0))
+
+        for policy in policies:
+            fees = policy.compute_fees(chunk["subtotal"])
+            policy_totals = totals[policy.name]
+            policy_totals["orders"] += orders
+            for column in FEE_COLUMNS:
+                policy_totals[column] += float(fees[column].sum())
+            policy_totals["free_delivery_orders"] += int(np.count_nonzero(fees["transportation_fee"] == 0))
+            policy_totals["surcharged_orders"] += int(np.count_nonzero(fees["small_order_fee"] > 0))
+
+    report = pd.DataFrame.from_dict(totals, orient="index")
+    report["fee_revenue"] = report[FEE_COLUMNS].sum(axis=1)
+    report["avg_fee_per_order"] = report["fee_revenue"] / report["orders"].where(report["orders"] > 0)
+    baseline = report.at[RECORDED, "fee_revenue"]
+    report["revenue_delta"] = report["fee_revenue"] - baseline
+    report["revenue_delta_pct"] = report["revenue_delta"] / baseline * 100 if baseline else np.nan
+    return report.round(2)
+
+
+def check_policy_names(policies: List[FeePolicy]):
+    """Each policy gets its own report row, so names must be unique and not RECORDED."""
+    seen = set()
+    for policy in policies:
+        if policy.name == RECORDED:
+            raise ValueError(f"Policy name {RECORDED!r} is reserved for the recorded fees")
+        if policy.name in seen:
+            raise ValueError(f"Duplicate policy name {policy.name!r}")
+        seen.add(policy.name)
+
+
+def load_policies(path: Optional[str]) -> List[FeePolicy]:
+    if path is None:
+        policies = [CURRENT_FEE_POLICY, *CANDIDATE_FEE_POLICIES]
+    else:
+        with open(path) as f:
+            policies = [FeePolicy.from_dict(policy) for policy in json.load(f)]
+    check_policy_names(policies)
+    return policies
+
+
+def build_query(
+    status: Optional[List[str]] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Dict:
+    query = {}
+    if status:
+        query["status"] = {"$in": status}
+    if since or until:
+        query["created_at"] = {}
+        if since:
+            query["created_at"]["$gte"] = since
+        if until:
+            query["created_at"]["$lt"] = until
+    return query
+
+
+def main(
+    policies: Optional[str] = typer.Option(None, help="JSON file with a list of FeePolicy definitions"),
+    status: Optional[List[str]] = typer.Option(None, help="Only include orders with this status (repeatable)"),
+    since: Optional[datetime] = typer.Option(None, help="Only include orders created at or after this time"),
+    until: Optional[datetime] = typer.Option(None, help="Only include orders created before this time"),
+    chunk_size: int = typer.Option(DEFAULT_CHUNK_SIZE, help="Orders loaded per chunk"),
+    output: Optional[str] = typer.Option(None, help="Also write the report to this CSV file"),
+):
+    try:
+        candidates = load_policies(policies)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--policies")
+
+    client = MongoClient(MONGO_URL)
+    try:
+        started = time.perf_counter()
+        chunks = load_order_chunks(client.grocery_delivery.orders, build_query(status, since, until), chunk_size)
+        report = simulate(chunks, candidates)
+        elapsed = time.perf_counter() - started
+    finally:
+        client.close()
+
+    typer.echo(report.to_string())
+    typer.echo(f"\nSimulated {int(report.at[RECORDED, 'orders'])} orders in {elapsed:.2f}s")
+    if output:
+        report.to_csv(output)
+
+
+if __name__ == "__main__":
+    typer.run(main)
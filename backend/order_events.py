@@ -0,0 +1,256 @@
+"""Append-only order event log.
+
+Order lifecycle changes are queued in-process and written to
+``db.order_events`` by a background task that group-commits them with
+``insert_many`` once ``batch_size`` events are waiting or ``flush_interval``
+seconds have passed. The queue is bounded, so producers wait when the
+database falls behind. ``stop()`` flushes everything queued before it.
+
+A batch that fails to write is retried with backoff while it is held, so the
+queue keeps applying backpressure during an outage. Once retries run out the
+batch is appended to a dead-letter file of extended-JSON lines, which can be
+loaded back with ``mongoimport --collection order_events --file <path>``.
+
+Replay rebuilds order state from the log, one order at a time:
+
+    python order_events.py [--order-id ID] [--verify]
+
+Replay order within an order is ``created_at`` (millisecond precision) then
+``seq``. ``seq`` counts per process and restarts at 0, so two events for the
+same order recorded by different workers within the same millisecond may
+replay in either order.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import typer
+from bson import json_util
+from pymongo import MongoClient
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+ORDER_CREATED = "order_created"
+ORDER_PAID = "order_paid"
+ORDER_STATUS_UPDATED = "order_status_updated"
+
+DEAD_LETTER_PATH = os.environ.get("ORDER_EVENTS_DEAD_LETTER_PATH", "order_events.dead_letter.jsonl")
+DUPLICATE_KEY_ERROR = 11000
+
+# Replay sort; run_migrations creates the matching index on db.order_events
+REPLAY_SORT = [("order_id", 1), ("created_at", 1), ("seq", 1)]
+
+# Queued by stop(); everything ahead of it is flushed before the flusher exits
+_STOP = object()
+
+
+class OrderEventLog:
+    def __init__(
+        self,
+        collection,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        max_queue_size: int = 10_000,
+        max_retries: int = 5,
+        retry_delay: float = 0.5,
+        max_retry_delay: float = 8.0,
+        dead_letter_path: str = DEAD_LETTER_PATH,
+    ):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.dead_letter_path = dead_letter_path
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._seq = 0
+        self._flusher: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything queued so far and stop the background flusher."""
+        if self._flusher is None:
+            return
+        await self.queue.put(_STOP)
+        await self._flusher
+        self._flusher = None
+
+    async def record(self, order_id: str, event_type: str, data: Dict[str, Any], user_id: Optional[str] = None):
+        """Queue an event; waits only when the queue is full (backpressure)."""
+        self._seq += 1
+        await self.queue.put({
+            "id": str(uuid.uuid4()),
+            "order_id": order_id,
+            "type": event_type,
+            "data": data,
+            "user_id": user_id,
+            "seq": self._seq,
+            "created_at": datetime.utcnow(),
+        })
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            event = await self.queue.get()
+            if event is _STOP:
+                return
+            batch = [event]
+            stopping = False
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if event is _STOP:
+                    stopping = True
+                    break
+                batch.append(event)
+            try:
+                await self._flush(batch)
+            except Exception:
+                # The flusher must outlive any one batch, or record() blocks forever once the queue fills
+                logger.exception("Failed to flush %d order events", len(batch))
+            if stopping:
+                return
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        attempts = 0
+        delay = self.retry_delay
+        while batch:
+            try:
+                await self.collection.insert_many(batch, ordered=True)
+                return
+            except BulkWriteError as e:
+                write_errors = e.details.get("writeErrors") or []
+                if write_errors:
+                    # An ordered insert stops at the first failing event; everything
+                    # before it is stored, everything after it was never tried.
+                    write_error = write_errors[0]
+                    failed = write_error["index"]
+                    if write_error.get("code") != DUPLICATE_KEY_ERROR:
+                        await self._dead_letter(batch[failed:failed + 1], write_error.get("errmsg", str(e)))
+                    # A duplicate _id means an earlier attempt stored it before its ack was lost
+                    batch = batch[failed + 1:]
+                    continue
+                # Only a write concern error: retry, already stored events come back as duplicates
+                error = e
+            except PyMongoError as e:
+                error = e
+            except Exception as e:
+                # Not a database error (e.g. an unencodable event); retrying will not help.
+                # Write events one at a time so only the bad one is dead-lettered.
+                if len(batch) > 1:
+                    for event in batch:
+                        await self._flush([event])
+                else:
+                    await self._dead_letter(batch, str(e))
+                return
+
+            attempts += 1
+            if attempts > self.max_retries:
+                await self._dead_letter(batch, str(error))
+                return
+            logger.warning(
+                "Failed to write %d order events (attempt %d), retrying in %.1fs: %s",
+                len(batch), attempts, delay, error,
+            )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+    async def _dead_letter(self, events: List[Dict[str, Any]], reason: str):
+        logger.error("Writing %d order events to %s: %s", len(events), self.dead_letter_path, reason)
+        lines = []
+        for event in events:
+            try:
+                lines.append(json_util.dumps(event) + "\n")
+            except Exception:
+                # Could not be stored as BSON or JSON either; the log is all that is left of it
+                logger.error("Dropping unserializable order event: %r", event)
+        if not lines:
+            return
+        try:
+            await asyncio.to_thread(self._append_dead_letters, "".join(lines))
+        except OSError:
+            logger.exception("Failed to write dead-letter file, %d order events lost", len(events))
+
+    def _append_dead_letters(self, lines: str):
+        with open(self.dead_letter_path, "a") as f:
+            f.write(lines)
+
+
+# Replay
+
+def apply_event(order: Optional[Dict[str, Any]], event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Fold one event into the order state it describes."""
+    if event["type"] == ORDER_CREATED:
+        return dict(event["data"])
+    if order is None:
+        return None
+    order = dict(order)
+    order.update(event["data"])
+    return order
+
+
+def replay_events(events: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Rebuild orders from events sorted by REPLAY_SORT, yielding each order
+    as soon as its last event is folded in."""
+    order_id, order = None, None
+    for event in events:
+        if event["order_id"] != order_id:
+            if order is not None:
+                yield order
+            order_id, order = event["order_id"], None
+        order = apply_event(order, event)
+    if order is not None:
+        yield order
+
+
+def main(
+    order_id: Optional[str] = typer.Option(None, help="Only replay this order"),
+    verify: bool = typer.Option(False, help="Compare replayed orders against db.orders"),
+):
+    client = MongoClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    try:
+        db = client.grocery_delivery
+        query = {"order_id": order_id} if order_id else {}
+        events = db.order_events.find(query, {"_id": 0}).sort(REPLAY_SORT)
+
+        replayed = 0
+        mismatched = 0
+        for order in replay_events(events):
+            replayed += 1
+            if not verify:
+                typer.echo(order)
+                continue
+            stored = db.orders.find_one({"id": order["id"]}, {"_id": 0})
+            if stored is None:
+                typer.echo(f"{order['id']}: missing from db.orders")
+                mismatched += 1
+                continue
+            diff = {key: (order.get(key), stored.get(key)) for key in ("status", "total") if order.get(key) != stored.get(key)}
+            if diff:
+                typer.echo(f"{order['id']}: {diff}")
+                mismatched += 1
+
+        if verify:
+            typer.echo(f"Replayed {replayed} orders, {mismatched} mismatched")
+        else:
+            typer.echo(f"Replayed {replayed} orders")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -1,19 +1,28 @@
 from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr
 from motor.motor_asyncio import AsyncIOMotorClient
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
+import asyncio
 import os
+import time
 import uuid
 from typing import List, Optional, Dict, Any
 
+from fee_policy import CURRENT_FEE_POLICY
+from order_events import OrderEventLog, ORDER_CREATED, ORDER_PAID, ORDER_STATUS_UPDATED, REPLAY_SORT
+from startup import StartupPipeline
+
 # Database setup
 MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
-client = AsyncIOMotorClient(MONGO_URL)
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "10"))
+client = AsyncIOMotorClient(MONGO_URL, minPoolSize=MONGO_MIN_POOL_SIZE)
 db = client.grocery_delivery
+order_events = OrderEventLog(db.order_events)
 
 # Security
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -81,6 +90,7 @@ class Order(BaseModel):
     subtotal: float
     service_fee: float
     transportation_fee: float
+    small_order_fee: float = 0.0
     total: float
     status: str
     created_at: datetime
@@ -135,12 +145,67 @@ def convert_mongo_doc(doc):
 def convert_mongo_docs(docs):
     return [convert_mongo_doc(doc) for doc in docs]
 
+# Catalog cache, refreshed at most every CATALOG_TTL_SECONDS and on admin product changes.
+# Invalidation only reaches the worker that handled the admin write; other workers
+# keep listing the old products (prices, stock) until their TTL runs out. Orders
+# are always priced from db.products, never from this cache.
+CATALOG_TTL_SECONDS = float(os.environ.get("CATALOG_TTL_SECONDS", "10"))
+CATEGORY_PIPELINE = [
+    {"$group": {"_id": "$category", "count": {"$sum": 1}}},
+    {"$project": {"category": "$_id", "count": 1, "_id": 0}}
+]
+catalog_cache = {"products": None, "categories": None, "loaded_at": 0.0, "generation": 0}
+catalog_lock = asyncio.Lock()
+
+def catalog_is_fresh():
+    return catalog_cache["products"] is not None and time.monotonic() - catalog_cache["loaded_at"] <= CATALOG_TTL_SECONDS
+
+async def load_catalog():
+    # Callers hold catalog_lock
+    while True:
+        generation = catalog_cache["generation"]
+        products = await db.products.find({}).to_list(length=None)
+        categories = await db.products.aggregate(CATEGORY_PIPELINE).to_list(length=None)
+        # Invalidated mid-load: the result may predate the admin write, so load again
+        if catalog_cache["generation"] == generation:
+            break
+    catalog_cache.update(products=convert_mongo_docs(products), categories=categories, loaded_at=time.monotonic())
+
+async def refresh_catalog():
+    async with catalog_lock:
+        await load_catalog()
+
+async def get_catalog():
+    if not catalog_is_fresh():
+        # One request reloads; concurrent ones wait and reuse its result
+        async with catalog_lock:
+            if not catalog_is_fresh():
+                await load_catalog()
+    return catalog_cache
+
+def invalidate_catalog():
+    catalog_cache["generation"] += 1
+    catalog_cache["products"] = None
+
+# Startup pipeline phases
+async def warm_connection_pool():
+    # Concurrent pings check out (and so open) up to MONGO_MIN_POOL_SIZE connections
+    await client.admin.command("ping")
+    await asyncio.gather(*(client.admin.command("ping") for _ in range(MONGO_MIN_POOL_SIZE)))
+
+async def run_migrations():
+    await db.products.create_index("id")
+    await db.products.create_index("category")
+    await db.users.create_index("email")
+    await db.orders.create_index("id")
+    await db.orders.create_index([("user_id", 1), ("created_at", -1)])
+    await db.order_events.create_index(REPLAY_SORT)
+
 # Initialize sample products
-@app.on_event("startup")
-async def startup_event():
+async def seed_products():
     # Check if products already exist
-    existing_products = await db.products.count_documents({})
-    if existing_products == 0:
+    existing_product = await db.products.find_one({}, {"_id": 1})
+    if existing_product is None:
         sample_products = [
             {
                 "id": str(uuid.uuid4()),
@@ -199,6 +264,36 @@ async def startup_event():
         ]
         await db.products.insert_many(sample_products)
 
+startup_pipeline = StartupPipeline([
+    ("connect", warm_connection_pool),
+    ("migrations", run_migrations),
+    ("seed", seed_products),
+    ("preload_catalog", refresh_catalog),
+])
+
+@app.on_event("startup")
+async def startup_event():
+    order_events.start()
+    startup_pipeline.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await startup_pipeline.stop()
+    await order_events.stop()
+
+# Health endpoints
+@app.get("/api/health/live")
+async def liveness():
+    return {"status": "alive"}
+
+@app.get("/api/health/ready")
+async def readiness():
+    # Includes the startup-phase timing report
+    report = startup_pipeline.report()
+    if not report["ready"]:
+        return JSONResponse(status_code=503, content=report)
+    return report
+
 # Auth endpoints
 @app.post("/api/register")
 async def register(user: UserCreate):
@@ -251,14 +346,19 @@ async def login(user: UserLogin):
 # Product endpoints
 @app.get("/api/products")
 async def get_products(category: Optional[str] = None, search: Optional[str] = None):
+    if not search:
+        products = (await get_catalog())["products"]
+        if category and category != "all":
+            products = [product for product in products if product["category"] == category]
+        return products
+
     query = {}
     if category and category != "all":
         query["category"] = category
-    if search:
-        query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}}
-        ]
+    query["$or"] = [
+        {"name": {"$regex": search, "$options": "i"}},
+        {"description": {"$regex": search, "$options": "i"}}
+    ]
     
     products = await db.products.find(query).to_list(length=None)
     return convert_mongo_docs(products)
@@ -272,12 +372,7 @@ async def get_product(product_id: str):
 
 @app.get("/api/categories")
 async def get_categories():
-    pipeline = [
-        {"$group": {"_id": "$category", "count": {"$sum": 1}}},
-        {"$project": {"category": "$_id", "count": 1, "_id": 0}}
-    ]
-    categories = await db.products.aggregate(pipeline).to_list(length=None)
-    return categories
+    return (await get_catalog())["categories"]
 
 # Cart and Order endpoints
 @app.post("/api/orders")
@@ -303,9 +398,7 @@ async def create_order(order: OrderCreate, current_user: dict = Depends(get_curr
         })
     
     # Calculate fees
-    service_fee = subtotal * 0.05  # 5% service fee
-    transportation_fee = 2.99  # Fixed transportation fee
-    total = subtotal + service_fee + transportation_fee
+    fees = CURRENT_FEE_POLICY.order_fees(subtotal)
     
     # Create order
     order_data = {
@@ -313,16 +406,19 @@ async def create_order(order: OrderCreate, current_user: dict = Depends(get_curr
         "user_id": current_user["id"],
         "items": order_items,
         "subtotal": round(subtotal, 2),
-        "service_fee": round(service_fee, 2),
-        "transportation_fee": round(transportation_fee, 2),
-        "total": round(total, 2),
+        "service_fee": fees["service_fee"],
+        "transportation_fee": fees["transportation_fee"],
+        "small_order_fee": fees["small_order_fee"],
+        "total": fees["total"],
         "status": "pending",
         "created_at": datetime.utcnow(),
         "delivery_address": order.delivery_address
     }
     
     await db.orders.insert_one(order_data)
-    return convert_mongo_doc(order_data)
+    order_data = convert_mongo_doc(order_data)
+    await order_events.record(order_data["id"], ORDER_CREATED, dict(order_data), user_id=current_user["id"])
+    return order_data
 
 @app.get("/api/orders")
 async def get_user_orders(current_user: dict = Depends(get_current_user)):
@@ -347,10 +443,9 @@ async def pay_order(order_id: str, current_user: dict = Depends(get_current_user
         raise HTTPException(status_code=400, detail="Order already processed")
     
     # Mock payment processing
-    await db.orders.update_one(
-        {"id": order_id},
-        {"$set": {"status": "paid", "paid_at": datetime.utcnow()}}
-    )
+    update = {"status": "paid", "paid_at": datetime.utcnow()}
+    await db.orders.update_one({"id": order_id}, {"$set": update})
+    await order_events.record(order_id, ORDER_PAID, update, user_id=current_user["id"])
     
     return {"message": "Payment successful", "order_id": order_id}
 
@@ -368,10 +463,10 @@ async def update_order_status(order_id: str, status: str, current_user: dict = D
     if not current_user.get("is_admin"):
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    await db.orders.update_one(
-        {"id": order_id},
-        {"$set": {"status": status, "updated_at": datetime.utcnow()}}
-    )
+    update = {"status": status, "updated_at": datetime.utcnow()}
+    result = await db.orders.update_one({"id": order_id}, {"$set": update})
+    if result.matched_count:
+        await order_events.record(order_id, ORDER_STATUS_UPDATED, update, user_id=current_user["id"])
     return {"message": "Order status updated"}
 
 @app.post("/api/admin/products")
@@ -384,6 +479,7 @@ async def create_product(product: ProductCreate, current_user: dict = Depends(ge
     product_data["created_at"] = datetime.utcnow()
     
     await db.products.insert_one(product_data)
+    invalidate_catalog()
     return convert_mongo_doc(product_data)
 
 @app.put("/api/admin/products/{product_id}")
@@ -395,6 +491,7 @@ async def update_product(product_id: str, product: ProductCreate, current_user:
         {"id": product_id},
         {"$set": {**product.dict(), "updated_at": datetime.utcnow()}}
     )
+    invalidate_catalog()
     return {"message": "Product updated"}
 
 @app.delete("/api/admin/products/{product_id}")
@@ -403,6 +500,7 @@ async def delete_product(product_id: str, current_user: dict = Depends(get_curre
         raise HTTPException(status_code=403, detail="Admin access required")
     
     await db.products.delete_one({"id": product_id})
+    invalidate_catalog()
     return {"message": "Product deleted"}
 
 if __name__ == "__main__":
@@ -0,0 +1,90 @@
+"""Background startup pipeline.
+
+Runs the slow parts of worker startup (connection warm-up, migrations,
+seeding, cache preloading) as named phases off the request path, retrying a
+failed phase with backoff, and records per-phase timings. The worker reports
+ready only once every phase has finished.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StartupPipeline:
+    def __init__(
+        self,
+        phases: List[Tuple[str, Callable[[], Awaitable[Any]]]],
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 30.0,
+    ):
+        self.phases = phases
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.ready = False
+        self.current_phase: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.timings: List[Dict[str, Any]] = []
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def run(self):
+        self._started_at = time.perf_counter()
+        for name, phase in self.phases:
+            self.current_phase = name
+            phase_started = time.perf_counter()
+            attempts = 0
+            delay = self.retry_delay
+            while True:
+                attempts += 1
+                try:
+                    await phase()
+                    break
+                except Exception as e:
+                    self.last_error = f"{name}: {e}"
+                    logger.exception("Startup phase %s failed (attempt %d), retrying in %.1fs", name, attempts, delay)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_retry_delay)
+            self.timings.append({
+                "phase": name,
+                "seconds": round(time.perf_counter() - phase_started, 4),
+                "attempts": attempts,
+            })
+
+        self._finished_at = time.perf_counter()
+        self.current_phase = None
+        self.last_error = None
+        self.ready = True
+        logger.info(
+            "Startup complete in %.3fs: %s",
+            self._finished_at - self._started_at,
+            ", ".join(f"{t['phase']}={t['seconds']:.3f}s" for t in self.timings),
+        )
+
+    def report(self) -> Dict[str, Any]:
+        total = None
+        if self._started_at is not None:
+            total = round((self._finished_at or time.perf_counter()) - self._started_at, 4)
+        return {
+            "ready": self.ready,
+            "current_phase": self.current_phase,
+            "last_error": self.last_error,
+            "total_seconds": total,
+            "phases": self.timings,
+        }
@@ -0,0 +1,98 @@
+import copy
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+# Backend modules are imported the way uvicorn loads server.py, from backend/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+
+def matches(doc, query):
+    return all(doc.get(key) == value for key, value in query.items())
+
+
+class FakeCursor:
+    def __init__(self, docs, before_read=None):
+        self.docs = docs
+        self.before_read = before_read
+
+    def sort(self, key, direction=1):
+        self.docs.sort(key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    async def to_list(self, length=None):
+        if self.before_read is not None:
+            await self.before_read()
+        return self.docs
+
+
+class FakeCollection:
+    """In-memory stand-in for the handful of Motor collection methods server.py uses."""
+
+    def __init__(self, docs=()):
+        self.docs = [dict(doc) for doc in docs]
+        self.find_calls = 0
+        # Awaited before find() results are returned, to hold a read mid-flight
+        self.before_read = None
+
+    async def find_one(self, query, projection=None):
+        for doc in self.docs:
+            if matches(doc, query):
+                return copy.deepcopy(doc)
+        return None
+
+    def find(self, query=None):
+        self.find_calls += 1
+        docs = [copy.deepcopy(doc) for doc in self.docs if matches(doc, query or {})]
+        return FakeCursor(docs, self.before_read)
+
+    def aggregate(self, pipeline):
+        # Only the category count pipeline from server.CATEGORY_PIPELINE
+        counts = {}
+        for doc in self.docs:
+            counts[doc["category"]] = counts.get(doc["category"], 0) + 1
+        return FakeCursor([{"category": category, "count": count} for category, count in counts.items()])
+
+    async def insert_one(self, doc):
+        doc["_id"] = ObjectId()
+        self.docs.append(copy.deepcopy(doc))
+
+    async def update_one(self, query, update):
+        for doc in self.docs:
+            if matches(doc, query):
+                doc.update(update["$set"])
+                return SimpleNamespace(matched_count=1, modified_count=1)
+        return SimpleNamespace(matched_count=0, modified_count=0)
+
+    async def delete_one(self, query):
+        self.docs = [doc for doc in self.docs if not matches(doc, query)]
+
+
+class FakeOrderEvents:
+    def __init__(self):
+        self.events = []
+
+    async def record(self, order_id, event_type, data, user_id=None):
+        self.events.append({"order_id": order_id, "type": event_type, "data": data, "user_id": user_id})
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """server.py with an in-memory database and event log."""
+    import server
+
+    db = SimpleNamespace(
+        products=FakeCollection([
+            {"id": "banana", "name": "Fresh Bananas", "price": 2.99, "category": "fruits"},
+            {"id": "apple", "name": "Apple Display", "price": 3.99, "category": "fruits"},
+            {"id": "bread", "name": "Fresh Bread", "price": 2.49, "category": "bakery"},
+        ]),
+        orders=FakeCollection(),
+        users=FakeCollection(),
+    )
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "order_events", FakeOrderEvents())
+    return server
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from startup import StartupPipeline
+
+ADMIN = {"id": "admin", "is_admin": True}
+
+
+@pytest.fixture
+def catalog_server(server, monkeypatch):
+    monkeypatch.setattr(server, "catalog_cache", {"products": None, "categories": None, "loaded_at": 0.0, "generation": 0})
+    monkeypatch.setattr(server, "catalog_lock", asyncio.Lock())
+    return server
+
+
+def product_ids(products):
+    return sorted(product["id"] for product in products)
+
+
+def test_load_overlapping_invalidation_is_reloaded(catalog_server):
+    server = catalog_server
+    products = server.db.products
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def hold_first_read():
+            products.before_read = None
+            await gate.wait()
+
+        products.before_read = hold_first_read
+        refresh = asyncio.create_task(server.refresh_catalog())
+        await asyncio.sleep(0.01)
+        # Admin write lands while the refresh still holds the old product list
+        await server.delete_product("bread", current_user=ADMIN)
+        gate.set()
+        await refresh
+        return await server.get_products()
+
+    assert product_ids(asyncio.run(scenario())) == ["apple", "banana"]
+    assert products.find_calls == 2
+
+
+def test_concurrent_requests_at_expiry_load_once(catalog_server):
+    server = catalog_server
+    products = server.db.products
+
+    async def slow_read():
+        await asyncio.sleep(0.01)
+
+    products.before_read = slow_read
+
+    async def scenario():
+        results = await asyncio.gather(*(server.get_products() for _ in range(10)))
+        assert products.find_calls == 1
+        assert all(product_ids(result) == ["apple", "banana", "bread"] for result in results)
+
+        server.catalog_cache["loaded_at"] = time.monotonic() - server.CATALOG_TTL_SECONDS - 1
+        await asyncio.gather(*(server.get_categories() for _ in range(10)))
+        assert products.find_calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_products_are_served_from_cache(catalog_server):
+    server = catalog_server
+
+    async def scenario():
+        all_products = await server.get_products()
+        fruits = await server.get_products(category="fruits")
+        everything = await server.get_products(category="all")
+        categories = await server.get_categories()
+        return all_products, fruits, everything, categories
+
+    all_products, fruits, everything, categories = asyncio.run(scenario())
+    assert product_ids(all_products) == ["apple", "banana", "bread"]
+    assert product_ids(fruits) == ["apple", "banana"]
+    assert product_ids(everything) == ["apple", "banana", "bread"]
+    assert sorted((c["category"], c["count"]) for c in categories) == [("bakery", 1), ("fruits", 2)]
+    assert server.db.products.find_calls == 1
+
+
+def test_admin_product_changes_invalidate_cache(catalog_server):
+    server = catalog_server
+
+    async def scenario():
+        await server.get_products()
+        product = server.ProductCreate(
+            name="Milk", description="Whole milk", price=1.99, category="dairy", image_url="", stock=10,
+        )
+        await server.create_product(product, current_user=ADMIN)
+        return await server.get_products(category="dairy"), await server.get_categories()
+
+    dairy, categories = asyncio.run(scenario())
+    assert [product["name"] for product in dairy] == ["Milk"]
+    assert "_id" not in dairy[0]
+    assert ("dairy", 1) in [(c["category"], c["count"]) for c in categories]
+
+
+def test_readiness_waits_for_startup_pipeline(server, monkeypatch):
+    async def scenario():
+        warm = asyncio.Event()
+
+        async def preload():
+            await warm.wait()
+
+        pipeline = StartupPipeline([("preload_catalog", preload)])
+        monkeypatch.setattr(server, "startup_pipeline", pipeline)
+        pipeline.start()
+        await asyncio.sleep(0.01)
+        before = await server.readiness()
+
+        warm.set()
+        await pipeline._task
+        after = await server.readiness()
+        return before, after
+
+    before, after = asyncio.run(scenario())
+    assert before.status_code == 503
+    report = json.loads(before.body)
+    assert report["ready"] is False
+    assert report["current_phase"] == "preload_catalog"
+
+    assert after["ready"] is True
+    assert [phase["phase"] for phase in after["phases"]] == ["preload_catalog"]
+    assert asyncio.run(server.liveness()) == {"status": "alive"}
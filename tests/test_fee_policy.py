@@ -0,0 +1,82 @@
+import random
+
+import numpy as np
+import pytest
+
+from fee_policy import CURRENT_FEE_POLICY, FeePolicy, round_cents
+
+
+def legacy_fees(subtotal):
+    # Fee calculation create_order used before fee policies existed
+    service_fee = subtotal * 0.05
+    transportation_fee = 2.99
+    total = subtotal + service_fee + transportation_fee
+    return {
+        "service_fee": round(service_fee, 2),
+        "transportation_fee": round(transportation_fee, 2),
+        "total": round(total, 2),
+    }
+
+
+@pytest.mark.parametrize("subtotal", [0.0, 0.1, 2.99, 12.9, 32.9, 12.1, 52.9, 7.7, 100.0, 1234.5])
+def test_current_policy_matches_legacy_fees(subtotal):
+    fees = CURRENT_FEE_POLICY.order_fees(subtotal)
+    assert {key: fees[key] for key in ("service_fee", "transportation_fee", "total")} == legacy_fees(subtotal)
+    assert fees["small_order_fee"] == 0.0
+
+
+def test_current_policy_matches_legacy_fees_on_baskets():
+    rng = random.Random(0)
+    prices = [2.99, 4.99, 3.49, 5.99, 2.49, 3.99]
+    for _ in range(20_000):
+        # Subtotals accumulated item by item like create_order does
+        subtotal = 0
+        for _ in range(rng.randint(1, 6)):
+            subtotal += rng.choice(prices) * rng.randint(1, 5)
+        fees = CURRENT_FEE_POLICY.order_fees(subtotal)
+        assert {key: fees[key] for key in ("service_fee", "transportation_fee", "total")} == legacy_fees(subtotal)
+
+
+def test_round_cents_matches_python_round():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([
+        rng.uniform(0, 500, 100_000) * 0.05,
+        np.arange(0, 100_000) / 1000,  # every .xx5 value up to 100
+        -rng.uniform(0, 5, 1_000),
+    ])
+    expected = np.array([round(float(value), 2) for value in values])
+    np.testing.assert_array_equal(round_cents(values), expected)
+
+
+def test_compute_fees_matches_order_fees():
+    policy = FeePolicy(
+        "mixed",
+        service_tiers=[(0.0, 0.06), (25.0, 0.05), (50.0, 0.04)],
+        free_delivery_threshold=35.0,
+        min_order_amount=10.0,
+        small_order_fee=1.5,
+    )
+    subtotals = np.round(np.random.default_rng(1).uniform(0, 120, 5_000), 2)
+    fees = policy.compute_fees(subtotals)
+    for i, subtotal in enumerate(subtotals):
+        expected = policy.order_fees(float(subtotal))
+        for key in ("service_fee", "transportation_fee", "small_order_fee"):
+            assert fees[key][i] == expected[key]
+
+
+def test_policy_rules():
+    policy = FeePolicy(
+        "mixed",
+        service_tiers=[(0.0, 0.06), (25.0, 0.05)],
+        free_delivery_threshold=35.0,
+        min_order_amount=10.0,
+        small_order_fee=1.5,
+    )
+    assert policy.order_fees(8.0) == {"service_fee": 0.48, "transportation_fee": 2.99, "small_order_fee": 1.5, "total": 12.97}
+    assert policy.order_fees(30.0)["service_fee"] == 1.5
+    assert policy.order_fees(35.0)["transportation_fee"] == 0.0
+
+
+def test_service_tiers_must_start_at_zero():
+    with pytest.raises(ValueError):
+        FeePolicy("bad", service_tiers=[(10.0, 0.05)])
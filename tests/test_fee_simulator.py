@@ -0,0 +1,146 @@
+import json
+import math
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from fee_policy import FeePolicy
+from fee_simulator import RECORDED, build_query, load_order_chunks, load_policies, simulate
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = iter(docs)
+        self.batch = None
+        self.closed = False
+
+    def batch_size(self, size):
+        self.batch = size
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.docs)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.cursor = FakeCursor(docs)
+        self.query = None
+        self.projection = None
+
+    def find(self, query, projection):
+        self.query = query
+        self.projection = projection
+        return self.cursor
+
+
+def order(subtotal, service_fee, transportation_fee=2.99, **extra):
+    return {"subtotal": subtotal, "service_fee": service_fee, "transportation_fee": transportation_fee, **extra}
+
+
+def chunk(subtotals, service_fees, transportation_fees, small_order_fees=None):
+    return {
+        "subtotal": np.array(subtotals, dtype=np.float64),
+        "service_fee": np.array(service_fees, dtype=np.float64),
+        "transportation_fee": np.array(transportation_fees, dtype=np.float64),
+        "small_order_fee": np.array(small_order_fees or [0.0] * len(subtotals), dtype=np.float64),
+    }
+
+
+def test_load_order_chunks_splits_and_fills_missing_columns():
+    docs = [order(10.0 * i, 0.5 * i) for i in range(1, 6)]
+    docs[4]["small_order_fee"] = 1.5
+    collection = FakeCollection(docs)
+
+    chunks = list(load_order_chunks(collection, {"status": "paid"}, chunk_size=2))
+
+    assert collection.query == {"status": "paid"}
+    assert collection.projection["_id"] == 0
+    assert collection.cursor.batch == 2
+    assert [len(c["subtotal"]) for c in chunks] == [2, 2, 1]
+    np.testing.assert_array_equal(chunks[0]["subtotal"], [10.0, 20.0])
+    # Orders from before small_order_fee existed count as no surcharge
+    np.testing.assert_array_equal(chunks[1]["small_order_fee"], [0.0, 0.0])
+    np.testing.assert_array_equal(chunks[2]["small_order_fee"], [1.5])
+    assert collection.cursor.closed
+
+
+def test_load_order_chunks_closes_cursor_when_abandoned():
+    collection = FakeCollection([order(10.0, 0.5) for _ in range(5)])
+    chunks = load_order_chunks(collection, chunk_size=2)
+    next(chunks)
+    chunks.close()
+    assert collection.cursor.closed
+
+
+def test_simulate_totals_and_deltas():
+    chunks = [
+        chunk([8.0], [0.4], [2.99]),
+        chunk([40.0], [2.0], [2.99]),
+    ]
+    policy = FeePolicy("free_over_35", free_delivery_threshold=35.0)
+
+    report = simulate(iter(chunks), [policy])
+
+    recorded = report.loc[RECORDED]
+    assert recorded["orders"] == 2
+    assert recorded["fee_revenue"] == pytest.approx(8.38)
+    assert recorded["revenue_delta"] == 0
+
+    row = report.loc["free_over_35"]
+    assert row["orders"] == 2
+    assert row["service_fee"] == pytest.approx(2.4)
+    assert row["transportation_fee"] == pytest.approx(2.99)
+    assert row["free_delivery_orders"] == 1
+    assert row["fee_revenue"] == pytest.approx(5.39)
+    assert row["avg_fee_per_order"] == pytest.approx(2.7)
+    assert row["revenue_delta"] == pytest.approx(-2.99)
+    assert row["revenue_delta_pct"] == pytest.approx(-35.68)
+
+
+def test_simulate_without_orders():
+    report = simulate(iter([]), [FeePolicy("current")])
+    assert list(report["orders"]) == [0, 0]
+    assert list(report["fee_revenue"]) == [0, 0]
+    assert all(math.isnan(value) for value in report["avg_fee_per_order"])
+    assert all(math.isnan(value) for value in report["revenue_delta_pct"])
+
+
+@pytest.mark.parametrize("names", [[RECORDED], ["a", "b", "a"]])
+def test_simulate_rejects_clashing_policy_names(names):
+    with pytest.raises(ValueError):
+        simulate(iter([]), [FeePolicy(name) for name in names])
+
+
+def test_load_policies_rejects_clashing_names(tmp_path):
+    path = tmp_path / "policies.json"
+    path.write_text(json.dumps([{"name": "a"}, {"name": "a", "free_delivery_threshold": 30.0}]))
+    with pytest.raises(ValueError):
+        load_policies(str(path))
+
+
+def test_load_policies_from_file(tmp_path):
+    path = tmp_path / "policies.json"
+    path.write_text(json.dumps([{"name": "tiered", "service_tiers": [[0, 0.06], [25, 0.04]]}]))
+    [policy] = load_policies(str(path))
+    assert policy.name == "tiered"
+    assert policy.service_tiers == [(0, 0.06), (25, 0.04)]
+
+
+def test_build_query():
+    since = datetime(2026, 1, 1)
+    until = datetime(2026, 2, 1)
+    assert build_query() == {}
+    assert build_query(status=["paid", "delivered"]) == {"status": {"$in": ["paid", "delivered"]}}
+    assert build_query(since=since) == {"created_at": {"$gte": since}}
+    assert build_query(status=["paid"], since=since, until=until) == {
+        "status": {"$in": ["paid"]},
+        "created_at": {"$gte": since, "$lt": until},
+    }
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from order_events import ORDER_CREATED, ORDER_PAID, ORDER_STATUS_UPDATED
+
+CUSTOMER = {"id": "customer", "is_admin": False}
+ADMIN = {"id": "admin", "is_admin": True}
+
+
+def place_order(server, items=(("banana", 2), ("bread", 1))):
+    order = server.OrderCreate(
+        items=[server.CartItem(product_id=product_id, quantity=quantity) for product_id, quantity in items],
+        delivery_address="Dorm 4",
+    )
+    return asyncio.run(server.create_order(order, current_user=CUSTOMER))
+
+
+def test_create_order_records_created_event(server):
+    order = place_order(server)
+
+    [event] = server.order_events.events
+    assert event["type"] == ORDER_CREATED
+    assert event["order_id"] == order["id"]
+    assert event["user_id"] == "customer"
+    assert "_id" not in event["data"]
+    assert event["data"] == order
+    # The event holds its own copy of the order
+    assert event["data"] is not order
+
+
+def test_create_order_for_unknown_product_records_nothing(server):
+    with pytest.raises(HTTPException):
+        place_order(server, items=[("missing", 1)])
+    assert server.order_events.events == []
+
+
+def test_pay_order_records_paid_event(server):
+    order = place_order(server)
+    asyncio.run(server.pay_order(order["id"], current_user=CUSTOMER))
+
+    event = server.order_events.events[-1]
+    assert event["type"] == ORDER_PAID
+    assert event["order_id"] == order["id"]
+    assert event["data"]["status"] == "paid"
+    assert event["data"]["paid_at"] == server.db.orders.docs[0]["paid_at"]
+
+
+def test_paying_twice_records_one_paid_event(server):
+    order = place_order(server)
+    asyncio.run(server.pay_order(order["id"], current_user=CUSTOMER))
+    with pytest.raises(HTTPException):
+        asyncio.run(server.pay_order(order["id"], current_user=CUSTOMER))
+    assert [event["type"] for event in server.order_events.events] == [ORDER_CREATED, ORDER_PAID]
+
+
+def test_update_order_status_records_event(server):
+    order = place_order(server)
+    asyncio.run(server.update_order_status(order["id"], "delivered", current_user=ADMIN))
+
+    event = server.order_events.events[-1]
+    assert event["type"] == ORDER_STATUS_UPDATED
+    assert event["order_id"] == order["id"]
+    assert event["user_id"] == "admin"
+    assert event["data"]["status"] == "delivered"
+
+
+def test_update_order_status_for_unknown_order_records_nothing(server):
+    asyncio.run(server.update_order_status("missing", "delivered", current_user=ADMIN))
+    assert server.order_events.events == []
+
+
+def test_update_order_status_requires_admin(server):
+    order = place_order(server)
+    with pytest.raises(HTTPException):
+        asyncio.run(server.update_order_status(order["id"], "delivered", current_user=CUSTOMER))
+    assert [event["type"] for event in server.order_events.events] == [ORDER_CREATED]
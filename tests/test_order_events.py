@@ -0,0 +1,236 @@
+import asyncio
+
+from bson import json_util
+from bson.errors import InvalidDocument
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from order_events import (
+    ORDER_CREATED,
+    ORDER_PAID,
+    ORDER_STATUS_UPDATED,
+    OrderEventLog,
+    apply_event,
+    replay_events,
+)
+
+
+class FakeCollection:
+    def __init__(self, failures=()):
+        # Exceptions raised by successive insert_many calls before they succeed
+        self.failures = list(failures)
+        self.calls = []
+        self.batches = []
+        self.release = None
+
+    async def insert_many(self, batch, ordered=True):
+        self.calls.append(list(batch))
+        if self.release is not None:
+            await self.release.wait()
+        if self.failures:
+            raise self.failures.pop(0)
+        for event in batch:
+            if not isinstance(event["data"].get("status", ""), str):
+                raise InvalidDocument(f"cannot encode object: {event['data']['status']!r}")
+        self.batches.append(list(batch))
+
+    @property
+    def stored(self):
+        return [event for batch in self.batches for event in batch]
+
+
+def make_log(collection, tmp_path, **kwargs):
+    kwargs.setdefault("retry_delay", 0.001)
+    return OrderEventLog(collection, dead_letter_path=str(tmp_path / "dead_letter.jsonl"), **kwargs)
+
+
+def test_flushes_when_batch_is_full(tmp_path):
+    async def scenario():
+        collection = FakeCollection()
+        log = make_log(collection, tmp_path, batch_size=3, flush_interval=60)
+        log.start()
+        for i in range(7):
+            await log.record("order", ORDER_STATUS_UPDATED, {"status": str(i)})
+        await asyncio.sleep(0.01)
+        assert [len(batch) for batch in collection.batches] == [3, 3]
+        await log.stop()
+        return collection
+
+    collection = asyncio.run(scenario())
+    assert [len(batch) for batch in collection.batches] == [3, 3, 1]
+    assert [event["data"]["status"] for event in collection.stored] == [str(i) for i in range(7)]
+
+
+def test_flushes_after_interval(tmp_path):
+    async def scenario():
+        collection = FakeCollection()
+        log = make_log(collection, tmp_path, batch_size=100, flush_interval=0.02)
+        log.start()
+        await log.record("order", ORDER_CREATED, {"id": "order"})
+        await log.record("order", ORDER_PAID, {"status": "paid"})
+        await asyncio.sleep(0.1)
+        assert [len(batch) for batch in collection.batches] == [2]
+        await log.stop()
+
+    asyncio.run(scenario())
+
+
+def test_stop_flushes_queued_events(tmp_path):
+    async def scenario():
+        collection = FakeCollection()
+        log = make_log(collection, tmp_path, batch_size=100, flush_interval=60)
+        log.start()
+        for i in range(5):
+            await log.record("order", ORDER_STATUS_UPDATED, {"status": str(i)})
+        await log.stop()
+        return collection
+
+    assert len(asyncio.run(scenario()).stored) == 5
+
+
+def test_full_queue_applies_backpressure(tmp_path):
+    async def scenario():
+        collection = FakeCollection()
+        collection.release = asyncio.Event()
+        log = make_log(collection, tmp_path, batch_size=1, flush_interval=60, max_queue_size=2)
+        log.start()
+        # One event is held by the blocked insert, two fill the queue
+        for i in range(3):
+            await log.record("order", ORDER_STATUS_UPDATED, {"status": str(i)})
+            await asyncio.sleep(0.01)
+        blocked = asyncio.create_task(log.record("order", ORDER_STATUS_UPDATED, {"status": "3"}))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+
+        collection.release.set()
+        await asyncio.wait_for(blocked, 1)
+        await log.stop()
+        return collection
+
+    assert len(asyncio.run(scenario()).stored) == 4
+
+
+def test_transient_error_is_retried(tmp_path):
+    async def scenario():
+        collection = FakeCollection(failures=[AutoReconnect("failover")])
+        log = make_log(collection, tmp_path, batch_size=10, flush_interval=60)
+        log.start()
+        for i in range(3):
+            await log.record("order", ORDER_STATUS_UPDATED, {"status": str(i)})
+        await log.stop()
+        return collection
+
+    collection = asyncio.run(scenario())
+    assert len(collection.calls) == 2
+    assert len(collection.stored) == 3
+    assert not (tmp_path / "dead_letter.jsonl").exists()
+
+
+def test_exhausted_retries_go_to_dead_letter_file(tmp_path):
+    async def scenario():
+        collection = FakeCollection(failures=[AutoReconnect("down")] * 3)
+        log = make_log(collection, tmp_path, batch_size=10, flush_interval=60, max_retries=2)
+        log.start()
+        for i in range(3):
+            await log.record("order", ORDER_STATUS_UPDATED, {"status": str(i)})
+        await log.stop()
+        return collection
+
+    collection = asyncio.run(scenario())
+    assert len(collection.calls) == 3
+    assert collection.stored == []
+    lines = (tmp_path / "dead_letter.jsonl").read_text().splitlines()
+    assert [json_util.loads(line)["data"]["status"] for line in lines] == ["0", "1", "2"]
+
+
+def test_partial_bulk_write_resumes_after_failed_event(tmp_path):
+    duplicate = BulkWriteError({"nInserted": 1, "writeErrors": [{"index": 1, "code": 11000, "errmsg": "dup"}]})
+    invalid = BulkWriteError({"nInserted": 0, "writeErrors": [{"index": 0, "code": 121, "errmsg": "invalid"}]})
+
+    async def scenario():
+        collection = FakeCollection(failures=[duplicate, invalid])
+        log = make_log(collection, tmp_path, batch_size=10, flush_interval=60)
+        log.start()
+        for i in range(5):
+            await log.record("order", ORDER_STATUS_UPDATED, {"status": str(i)})
+        await log.stop()
+        return collection
+
+    collection = asyncio.run(scenario())
+    # Event 0 stored, 1 already stored, 2 rejected, 3 and 4 written on the next call
+    assert [[event["data"]["status"] for event in call] for call in collection.calls] == [
+        ["0", "1", "2", "3", "4"],
+        ["2", "3", "4"],
+        ["3", "4"],
+    ]
+    lines = (tmp_path / "dead_letter.jsonl").read_text().splitlines()
+    assert [json_util.loads(line)["data"]["status"] for line in lines] == ["2"]
+
+
+def test_unencodable_event_does_not_stop_the_flusher(tmp_path):
+    async def scenario():
+        collection = FakeCollection()
+        log = make_log(collection, tmp_path, batch_size=3, flush_interval=0.01, max_queue_size=2)
+        log.start()
+        await log.record("order", ORDER_STATUS_UPDATED, {"status": "0"})
+        await log.record("order", ORDER_STATUS_UPDATED, {"status": object()})
+        await log.record("order", ORDER_STATUS_UPDATED, {"status": "2"})
+        # More events than the queue holds: these block forever if the flusher died
+        for i in range(3, 8):
+            await asyncio.wait_for(log.record("order", ORDER_STATUS_UPDATED, {"status": str(i)}), 1)
+        await asyncio.wait_for(log.stop(), 1)
+        return collection
+
+    collection = asyncio.run(scenario())
+    assert [event["data"]["status"] for event in collection.stored] == ["0", "2", "3", "4", "5", "6", "7"]
+    # json_util cannot serialize it either, so it is logged and dropped
+    assert not (tmp_path / "dead_letter.jsonl").exists()
+
+
+def test_flusher_survives_a_failing_flush(tmp_path):
+    async def scenario():
+        collection = FakeCollection()
+        log = make_log(collection, tmp_path, batch_size=1, flush_interval=60)
+        real_flush = log._flush
+        calls = []
+
+        async def flush(batch):
+            calls.append(batch)
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+            await real_flush(batch)
+
+        log._flush = flush
+        log.start()
+        for i in range(3):
+            await log.record("order", ORDER_STATUS_UPDATED, {"status": str(i)})
+        await asyncio.wait_for(log.stop(), 1)
+        return collection
+
+    collection = asyncio.run(scenario())
+    assert [event["data"]["status"] for event in collection.stored] == ["1", "2"]
+
+
+def test_apply_event():
+    created = {"order_id": "a", "type": ORDER_CREATED, "data": {"id": "a", "status": "pending", "total": 5.0}}
+    paid = {"order_id": "a", "type": ORDER_PAID, "data": {"status": "paid"}}
+
+    order = apply_event(None, created)
+    assert order == {"id": "a", "status": "pending", "total": 5.0}
+    assert apply_event(order, paid) == {"id": "a", "status": "paid", "total": 5.0}
+    assert order["status"] == "pending"
+    # Updates without a creation event have nothing to apply to
+    assert apply_event(None, paid) is None
+
+
+def test_replay_events_yields_one_order_at_a_time():
+    events = [
+        {"order_id": "a", "type": ORDER_CREATED, "data": {"id": "a", "status": "pending"}},
+        {"order_id": "a", "type": ORDER_PAID, "data": {"status": "paid"}},
+        {"order_id": "a", "type": ORDER_STATUS_UPDATED, "data": {"status": "delivered"}},
+        {"order_id": "b", "type": ORDER_PAID, "data": {"status": "paid"}},
+        {"order_id": "c", "type": ORDER_CREATED, "data": {"id": "c", "status": "pending"}},
+    ]
+    assert list(replay_events(events)) == [
+        {"id": "a", "status": "delivered"},
+        {"id": "c", "status": "pending"},
+    ]
@@ -0,0 +1,105 @@
+import asyncio
+
+from startup import StartupPipeline
+
+
+def test_phases_run_in_order_and_report_ready():
+    calls = []
+
+    def phase(name):
+        async def run():
+            calls.append(name)
+        return run
+
+    async def scenario():
+        pipeline = StartupPipeline([("connect", phase("connect")), ("seed", phase("seed"))])
+        assert pipeline.report() == {
+            "ready": False,
+            "current_phase": None,
+            "last_error": None,
+            "total_seconds": None,
+            "phases": [],
+        }
+        pipeline.start()
+        await pipeline._task
+        return pipeline.report()
+
+    report = asyncio.run(scenario())
+    assert calls == ["connect", "seed"]
+    assert report["ready"] is True
+    assert report["current_phase"] is None
+    assert [(t["phase"], t["attempts"]) for t in report["phases"]] == [("connect", 1), ("seed", 1)]
+    assert report["total_seconds"] >= 0
+
+
+def test_failed_phase_is_retried_with_backoff(monkeypatch):
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 4:
+            raise RuntimeError("mongo down")
+
+    async def scenario():
+        pipeline = StartupPipeline([("connect", flaky)], retry_delay=1.0, max_retry_delay=3.0)
+        pipeline.start()
+        await pipeline._task
+        return pipeline.report()
+
+    report = asyncio.run(scenario())
+    assert delays == [1.0, 2.0, 3.0]
+    assert report["ready"] is True
+    assert report["last_error"] is None
+    assert report["phases"][0]["attempts"] == 4
+
+
+def test_report_while_phase_is_failing():
+    async def failing():
+        raise RuntimeError("mongo down")
+
+    async def scenario():
+        pipeline = StartupPipeline([("connect", failing)], retry_delay=60)
+        pipeline.start()
+        await asyncio.sleep(0.01)
+        report = pipeline.report()
+        await pipeline.stop()
+        return report
+
+    report = asyncio.run(scenario())
+    assert report["ready"] is False
+    assert report["current_phase"] == "connect"
+    assert report["last_error"] == "connect: mongo down"
+
+
+def test_stop_cancels_running_phase():
+    cancelled = []
+
+    async def hangs():
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def after():
+        raise AssertionError("must not run after stop()")
+
+    async def scenario():
+        pipeline = StartupPipeline([("seed", hangs), ("preload_catalog", after)])
+        pipeline.start()
+        await asyncio.sleep(0.01)
+        await pipeline.stop()
+        return pipeline
+
+    pipeline = asyncio.run(scenario())
+    assert cancelled == [True]
+    assert pipeline.ready is False
+    assert pipeline._task is None